@@ -0,0 +1,20 @@
+"""
+Generates the static files which are embedded in the documentation, so that building the docs
+doesn't need to serialize the pipeline templates. Re-run this whenever the templates change
+
+    python docs/_generate_static.py
+"""
+from pathlib import Path
+
+from fastpdi_dpp.pipeline.templates import FASTPDI_PDI
+
+STATIC_DIR = Path(__file__).parent / "_static"
+
+
+def main():
+    STATIC_DIR.mkdir(exist_ok=True)
+    (STATIC_DIR / "pdi_example.toml").write_text(FASTPDI_PDI.to_toml())
+
+
+if __name__ == "__main__":
+    main()
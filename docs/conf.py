@@ -1,21 +1,13 @@
 import os
 from datetime import date
-
-from pkg_resources import DistributionNotFound, get_distribution
-
-from fastpdi_dpp.cli.dpp import (
-    calib_parser,
-    new_parser,
-    run_parser,
-    sort_parser,
-    table_parser,
-)
-from fastpdi_dpp.pipeline.templates import FASTPDI_PDI
+from importlib.metadata import PackageNotFoundError
+from importlib.metadata import version as get_version
+from pathlib import Path
 
 # -- Project information -----------------------------------------------------
 try:
-    __version__ = get_distribution("fastpdi_dpp").version
-except DistributionNotFound:
+    __version__ = get_version("fastpdi_dpp")
+except PackageNotFoundError:
     __version__ = "unknown version"
 
 # The full version, including alpha/beta/rc tags
@@ -25,9 +17,8 @@ release = __version__
 project = "fastpdi_dpp"
 author = "Miles Lucas"
 # get current year
-current_year = date.today().year
-years = range(2022, current_year + 1)
-copyright = f"{', '.join(map(str, years))}, {author}"
+CURRENT_YEAR = date.today().year
+copyright = f"2022-{CURRENT_YEAR}, {author}"
 
 
 # -- General configuration ---------------------------------------------------
@@ -40,21 +31,31 @@ extensions = [
 ]
 myst_enable_extensions = ["dollarmath", "substitution"]
 
+# generated by _generate_static.py
 pdi_toml = f"""
 <details>
 <summary>PDI example</summary>
 
 ```toml
-{FASTPDI_PDI.to_toml()}
+{(Path(__file__).parent / "_static" / "pdi_example.toml").read_text()}
 ```
 </details>
 """
+
+
+def _help(name):
+    from fastpdi_dpp.cli.fpp import add_subcommands
+
+    parser = add_subcommands(name)[name]
+    return f"```\n{parser.format_help()}```"
+
+
 myst_substitutions = {
-    "dpprun_help": f"```\n{run_parser.format_help()}```",
-    "dppsort_help": f"```\n{sort_parser.format_help()}```",
-    "dppnew_help": f"```\n{new_parser.format_help()}```",
-    "dppcalib_help": f"```\n{calib_parser.format_help()}```",
-    "dpptable_help": f"```\n{table_parser.format_help()}```",
+    "dpprun_help": _help("run"),
+    "dppsort_help": _help("sort"),
+    "dppnew_help": _help("new"),
+    "dppcalib_help": _help("calib"),
+    "dpptable_help": _help("table"),
     "pdi_toml": pdi_toml,
 }
 myst_heading_anchors = 2
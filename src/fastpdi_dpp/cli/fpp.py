@@ -1,94 +1,120 @@
+import argparse
 import glob
 import logging
 import os
 import readline
+import sys
 from argparse import ArgumentParser
+from functools import lru_cache
 from pathlib import Path
 
-import astropy.units as u
-from serde.toml import to_toml
-
-import fastpdi_dpp as fpp
-from fastpdi_dpp.calibration import make_master_dark, make_master_flat
-from fastpdi_dpp.constants import DEFAULT_NPROC
-from fastpdi_dpp.organization import header_table, sort_files
-from fastpdi_dpp.pipeline.config import (
-    CamCtrOption,
-    CamFileInput,
-    CoordinateOptions,
-    CoronagraphOptions,
-    SatspotOptions,
-)
-from fastpdi_dpp.pipeline.pipeline import Pipeline
-from fastpdi_dpp.pipeline.templates import (
-    FASTPDI_MAXIMAL,
-    FASTPDI_PDI,
-)
-from fastpdi_dpp.wcs import get_gaia_astrometry
-
 # set up logging
 formatter = logging.Formatter(
     "%(asctime)s|%(name)s|%(levelname)s - %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
 )
 
+
+def _get_locale():
+    # same precedence that gettext uses to pick the message language
+    for var in ("LANGUAGE", "LC_ALL", "LC_MESSAGES", "LANG"):
+        value = os.environ.get(var)
+        if value:
+            return value.split(":")[0]
+    return "C"
+
+
+# argparse passes every help and error string through gettext, which searches for message
+# catalogs on every call. There are no translations for dpp so skip that for English locales
+if _get_locale().split(".")[0].split("_")[0] in ("C", "POSIX", "en"):
+    argparse._ = lambda message: message
+
 # set up command line arguments
 parser = ArgumentParser(prog="dpp")
 parser.add_argument("-v", "--version", action="store_true", help="print version information")
 subparser = parser.add_subparsers(help="command to run")
 
-########## sort ##########
+# options shared between subcommands
+_nproc_parent = ArgumentParser(add_help=False)
+_nproc_parent.add_argument(
+    "-j",
+    "--num-proc",
+    type=int,
+    help="number of processors to use for multiprocessing (default is the number of available CPUs, up to 8)",
+)
+_quiet_parent = ArgumentParser(add_help=False)
+_quiet_parent.add_argument(
+    "-q",
+    "--quiet",
+    action="store_true",
+    help="silence the progress bar",
+)
+_output_parent = ArgumentParser(add_help=False)
+_output_parent.add_argument(
+    "-o",
+    "--output",
+    help="output directory, if not specified will use current working directory",
+)
 
 
-def sort(args):
-    outdir = args.output if args.output else Path.cwd()
+def _ext_type(ext):
+    # HDUs can be given by index or name
     try:
-        ext = int(args.ext)
+        return int(ext)
     except ValueError:
-        ext = args.ext
+        return ext
+
+
+def _confirm(prompt, default=False):
+    # only look at the first character, so "y", "Y", "yes", etc. all confirm
+    response = input(prompt).strip()[:1]
+    if response == "":
+        return default
+    return response in ("y", "Y")
+
+
+########## sort ##########
+
+
+def sort(args):
+    from fastpdi_dpp.organization import sort_files
+
+    outdir = args.output if args.output else args.cwd
     sort_files(
         args.filenames,
         copy=args.copy,
-        ext=ext,
+        ext=args.ext,
         output_directory=outdir,
         num_proc=args.num_proc,
         quiet=args.quiet,
     )
 
 
-sort_parser = subparser.add_parser(
-    "sort",
-    aliases="s",
-    help="sort raw FastPDI data",
-    description="Sorts raw data based on the data type. This will either use the `DATA-TYP` header value or the `U_OGFNAM` header, depending on when your data was taken.",
-)
-sort_parser.add_argument("filenames", nargs="+", help="FITS files to sort")
-sort_parser.add_argument(
-    "-o", "--output", help="output directory, if not specified will use current working directory"
-)
-sort_parser.add_argument(
-    "-c", "--copy", action="store_true", help="copy files instead of moving them"
-)
-sort_parser.add_argument("-e", "--ext", default=0, help="FITS extension/HDU to use")
-sort_parser.add_argument(
-    "-j",
-    "--num-proc",
-    type=int,
-    default=DEFAULT_NPROC,
-    help="number of processors to use for multiprocessing (default is %(default)d)",
-)
-sort_parser.add_argument(
-    "-q",
-    "--quiet",
-    action="store_true",
-    help="silence the progress bar",
-)
-sort_parser.set_defaults(func=sort)
+def _build_sort_parser(subparser, aliases):
+    sort_parser = subparser.add_parser(
+        "sort",
+        aliases=aliases,
+        parents=[_nproc_parent, _quiet_parent, _output_parent],
+        help="sort raw FastPDI data",
+        description="Sorts raw data based on the data type. This will either use the `DATA-TYP` header value or the `U_OGFNAM` header, depending on when your data was taken.",
+    )
+    sort_parser.add_argument("filenames", nargs="+", help="FITS files to sort")
+    sort_parser.add_argument(
+        "-c", "--copy", action="store_true", help="copy files instead of moving them"
+    )
+    sort_parser.add_argument(
+        "-e", "--ext", default=0, type=_ext_type, help="FITS extension/HDU to use"
+    )
+    sort_parser.set_defaults(func=sort)
+    return sort_parser
+
 
 ########## calib ##########
 
 
 def calib(args):
-    outdir = args.output if args.output else Path.cwd()
+    from fastpdi_dpp.calibration import make_master_dark, make_master_flat
+
+    outdir = args.output if args.output else args.cwd
 
     master_darks = master_flats = None
     if args.darks is not None:
@@ -112,37 +138,28 @@ def calib(args):
         )
 
 
-calib_parser = subparser.add_parser(
-    "calib",
-    aliases="c",
-    help="create calibration files",
-    description="Create calibration files from darks and flats.",
-)
-calib_parser.add_argument("--darks", nargs="*", help="FITS files to use as dark frames")
-calib_parser.add_argument("--flats", nargs="*", help="FITS files to use as flat frames")
-calib_parser.add_argument(
-    "-c", "--collapse", default="median", choices=("median", "mean", "varmean", "biweight")
-)
-calib_parser.add_argument(
-    "-o", "--output", help="output directory, if not specified will use current working directory"
-)
-calib_parser.add_argument(
-    "-f", "--force", action="store_true", help="Force recomputation and overwrite existing files."
-)
-calib_parser.add_argument(
-    "-j",
-    "--num-proc",
-    type=int,
-    default=DEFAULT_NPROC,
-    help="number of processors to use for multiprocessing (default is %(default)d)",
-)
-calib_parser.add_argument(
-    "-q",
-    "--quiet",
-    action="store_true",
-    help="silence the progress bar",
-)
-calib_parser.set_defaults(func=calib)
+def _build_calib_parser(subparser, aliases):
+    calib_parser = subparser.add_parser(
+        "calib",
+        aliases=aliases,
+        parents=[_nproc_parent, _quiet_parent, _output_parent],
+        help="create calibration files",
+        description="Create calibration files from darks and flats.",
+    )
+    calib_parser.add_argument("--darks", nargs="*", help="FITS files to use as dark frames")
+    calib_parser.add_argument("--flats", nargs="*", help="FITS files to use as flat frames")
+    calib_parser.add_argument(
+        "-c", "--collapse", default="median", choices=("median", "mean", "varmean", "biweight")
+    )
+    calib_parser.add_argument(
+        "-f",
+        "--force",
+        action="store_true",
+        help="Force recomputation and overwrite existing files.",
+    )
+    calib_parser.set_defaults(func=calib)
+    return calib_parser
+
 
 ########## new ##########
 
@@ -196,7 +213,27 @@ class TabCompleter:
 
 
 def new_config(args):
+    import astropy.units as u
+
+    from fastpdi_dpp.pipeline.config import (
+        CamCtrOption,
+        CamFileInput,
+        CoordinateOptions,
+        CoronagraphOptions,
+        SatspotOptions,
+    )
+    from fastpdi_dpp.pipeline.templates import FASTPDI_MAXIMAL, FASTPDI_PDI
+    from fastpdi_dpp.wcs import get_gaia_astrometry
+
     path = Path(args.config)
+    # deal with existing files before going through all of the prompts
+    if path.is_file() and not args.yes:
+        if args.no_overwrite:
+            return
+        if not sys.stdin.isatty():
+            raise FileExistsError(
+                f"{path} already exists, use --yes to overwrite it or --no-overwrite to keep it"
+            )
 
     readline.set_completer_delims(" \t\n;")
     readline.parse_and_bind("tab: complete")
@@ -207,18 +244,16 @@ def new_config(args):
     iwa_completer = completer.createListCompleter(iwa_choices)
 
     ## get template
-    template_choices = ["pdi", "all"]
+    templates = {"pdi": FASTPDI_PDI, "all": FASTPDI_MAXIMAL}
+    template_choices = list(templates.keys())
     template_completer = completer.createListCompleter(template_choices)
 
     readline.set_completer(template_completer)
     template = input(f"Choose a starting template [{'/'.join(template_choices)}]: ").strip().lower()
-    match template:
-        case "pdi":
-            t = FASTPDI_PDI
-        case "all":
-            t = FASTPDI_MAXIMAL
-        case _:
-            raise ValueError(f"template not recognized {template}")
+    try:
+        tpl = templates[template]
+    except KeyError:
+        raise ValueError(f"template not recognized {template}")
     readline.set_completer()
 
     ## get name
@@ -272,8 +307,7 @@ def new_config(args):
         print("No coordinate information set; will only use header values.")
 
     ## darks
-    have_darks = input("Do you have dark files? [Y/n]: ").strip().lower()
-    if have_darks == "" or have_darks == "y":
+    if _confirm("Do you have dark files? [Y/n]: ", default=True):
         readline.set_completer(completer.pathCompleter)
         cam1_path = input("Enter path to cam1 dark (optional): ").strip()
         cam1_path = None if cam1_path == "" else cam1_path
@@ -292,8 +326,7 @@ def new_config(args):
         tpl.calibrate.master_darks = CamFileInput(cam1=cam1_path, cam2=cam2_path)
 
     ## flats
-    have_flats = input("Do you have flat files? [Y/n]: ").strip().lower()
-    if have_flats == "" or have_flats == "y":
+    if _confirm("Do you have flat files? [Y/n]: ", default=True):
         readline.set_completer(completer.pathCompleter)
         cam1_path = input("Enter path to cam1 flat (optional): ").strip()
         cam1_path = None if cam1_path == "" else cam1_path
@@ -312,8 +345,7 @@ def new_config(args):
         tpl.calibrate.master_flats = CamFileInput(cam1=cam1_path, cam2=cam2_path)
 
     ## Coronagraph
-    have_coro = input("Did you use a coronagraph? [y/N]: ").strip().lower()
-    if have_coro == "y":
+    if _confirm("Did you use a coronagraph? [y/N]: "):
         readline.set_completer(iwa_completer)
         iwa = float(input(f"  Enter coronagraph IWA (mas) [{'/'.join(iwa_choices)}]: ").strip())
         tpl.coronagraph = CoronagraphOptions(iwa=iwa)
@@ -322,8 +354,7 @@ def new_config(args):
     ## Satellite spots
     _default = tpl.coronagraph is not None
     prompt = "Y/n" if _default else "y/N"
-    have_satspot = input(f"Did you use satellite spots? [{prompt}]: ").strip().lower()
-    if (_default and have_satspot == "") or have_satspot == "y":
+    if _confirm(f"Did you use satellite spots? [{prompt}]: ", default=_default):
         _default = 15.8
         radius = input(f"  Enter satspot radius (lam/D) [{_default}]: ").strip()
         spotrad = _default if radius == "" else float(radius)
@@ -334,8 +365,7 @@ def new_config(args):
         tpl.satspots = SatspotOptions(radius=spotrad, amp=spotamp)
 
     ## Frame centers
-    set_framecenters = input(f"Do you want to specify frame centers? [y/N]: ").strip().lower()
-    if set_framecenters == "y":
+    if _confirm(f"Do you want to specify frame centers? [y/N]: "):
         cam1_ctr = cam2_ctr = None
         cam1_ctr_input = input("Enter comma-separated center for cam1 (x, y) (optional): ").strip()
         if cam1_ctr_input != "":
@@ -362,17 +392,12 @@ def new_config(args):
                     cam2_ctr = list(map(float, toks))
         tpl.frame_centers = CamCtrOption(cam1=cam1_ctr, cam2=cam2_ctr)
 
-    toml_str = to_toml(tpl)
+    toml_str = tpl.to_toml()
 
-    if path.is_file():
-        response = (
-            input(
-                f"{path.name} already exists in output directory, would you like to overwrite it? [y/N] "
-            )
-            .strip()
-            .lower()
-        )
-        if response != "y":
+    if path.is_file() and not args.yes:
+        if not _confirm(
+            f"{path.name} already exists in output directory, would you like to overwrite it? [y/N] "
+        ):
             return
 
     with path.open("w") as fh:
@@ -381,89 +406,205 @@ def new_config(args):
     return path
 
 
-new_parser = subparser.add_parser("new", aliases="n", help="generate configuration files")
-new_parser.add_argument("config", help="path to configuration file")
-new_parser.set_defaults(func=new_config)
+def _build_new_parser(subparser, aliases):
+    new_parser = subparser.add_parser("new", aliases=aliases, help="generate configuration files")
+    new_parser.add_argument("config", help="path to configuration file")
+    overwrite_group = new_parser.add_mutually_exclusive_group()
+    overwrite_group.add_argument(
+        "-y", "--yes", action="store_true", help="overwrite an existing config without asking"
+    )
+    overwrite_group.add_argument(
+        "-n", "--no-overwrite", action="store_true", help="never overwrite an existing config"
+    )
+    new_parser.set_defaults(func=new_config)
+    return new_parser
+
 
 ########## run ##########
 
 
 def run(args):
+    from fastpdi_dpp.pipeline.pipeline import Pipeline
+
     path = Path(args.config)
     pipeline = Pipeline.from_file(path)
     pipeline.run(args.filenames, num_proc=args.num_proc)
 
 
-run_parser = subparser.add_parser("run", aliases="r", help="run the data processing pipeline")
-run_parser.add_argument("config", help="path to configuration file")
-run_parser.add_argument("filenames", nargs="*", help="FITS files to run through pipeline")
-run_parser.add_argument(
-    "-j",
-    "--num-proc",
-    type=int,
-    default=DEFAULT_NPROC,
-    help="number of processors to use for multiprocessing (default is %(default)d)",
-)
-run_parser.set_defaults(func=run)
+def _build_run_parser(subparser, aliases):
+    run_parser = subparser.add_parser(
+        "run", aliases=aliases, parents=[_nproc_parent], help="run the data processing pipeline"
+    )
+    run_parser.add_argument("config", help="path to configuration file")
+    run_parser.add_argument("filenames", nargs="*", help="FITS files to run through pipeline")
+    run_parser.set_defaults(func=run)
+    return run_parser
+
 
 ########## table ##########
 
 
 def table(args):
+    import csv
+    import math
+
+    from fastpdi_dpp.organization import header_table_iter
+
     # handle name clashes
     outpath = Path(args.output).resolve()
     if outpath.is_file():
-        resp = input(f"{outpath.name} already exists in the output directory. Overwrite? [y/N]: ")
-        if resp.strip().lower() != "y":
+        if not _confirm(
+            f"{outpath.name} already exists in the output directory. Overwrite? [y/N]: "
+        ):
             return
-    # tryparse ext as int
-    try:
-        ext = int(args.ext)
-    except ValueError:
-        ext = args.ext
-    df = header_table(args.filenames, ext=ext, num_proc=args.num_proc, quiet=args.quiet)
-    df.to_csv(outpath)
-
+    kwargs = {} if args.ext is None else {"ext": args.ext}
+    rows = list(
+        header_table_iter(args.filenames, num_proc=args.num_proc, quiet=args.quiet, **kwargs)
+    )
+    # write the rows directly instead of building a DataFrame. The columns are every
+    # header key (in the order they first appear), sorted by MJD like `header_table`
+    fieldnames = dict.fromkeys(key for row in rows for key in row)
+    rows.sort(key=lambda row: row.get("MJD", math.inf))
+    with outpath.open("w", newline="") as fh:
+        writer = csv.DictWriter(fh, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow(row)
+
+
+def _build_table_parser(subparser, aliases):
+    table_parser = subparser.add_parser(
+        "table",
+        aliases=aliases,
+        parents=[_nproc_parent, _quiet_parent],
+        help="create CSV from headers",
+        description="Go through each file and combine the header information into a single CSV.",
+    )
+    table_parser.add_argument("filenames", nargs="+", help="FITS files to parse headers from")
+    table_parser.add_argument(
+        "-o",
+        "--output",
+        default="header_table.csv",
+        help="Output CSV filename (default is '%(default)s')",
+    )
+    table_parser.add_argument(
+        "-e",
+        "--ext",
+        type=_ext_type,
+        help="FITS extension/HDU to use (default is 1 for .fits.fz files, otherwise 0)",
+    )
+    table_parser.set_defaults(func=table)
+    return table_parser
 
-table_parser = subparser.add_parser(
-    "table",
-    aliases="t",
-    help="create CSV from headers",
-    description="Go through each file and combine the header information into a single CSV.",
-)
-table_parser.add_argument("filenames", nargs="+", help="FITS files to parse headers from")
-table_parser.add_argument(
-    "-o",
-    "--output",
-    default="header_table.csv",
-    help="Output CSV filename (default is '%(default)s')",
-)
-table_parser.add_argument("-e", "--ext", default=0, help="FITS extension/HDU to use")
-table_parser.add_argument(
-    "-j",
-    "--num-proc",
-    default=DEFAULT_NPROC,
-    type=int,
-    help="Number of processes to use for multi-processing (default is %(default)d)",
-)
-table_parser.add_argument(
-    "-q",
-    "--quiet",
-    action="store_true",
-    help="silence the progress bar",
-)
-table_parser.set_defaults(func=table)
 
 ########## main ##########
 
+# subcommand name -> (function which adds that subcommand's parser, aliases). The parsers
+# are only built when needed, so that e.g. `dpp sort` never pays for setting up `dpp run`
+SUBCOMMANDS = {
+    "sort": (_build_sort_parser, ["s"]),
+    "calib": (_build_calib_parser, ["c"]),
+    "new": (_build_new_parser, ["n"]),
+    "run": (_build_run_parser, ["r"]),
+    "table": (_build_table_parser, ["t"]),
+}
+ALIASES = {alias: name for name, (_, aliases) in SUBCOMMANDS.items() for alias in aliases}
+
+_subparsers = {}
+
+# pre-rendered output of `parser.print_help()`, so that `dpp` and `dpp -h` don't need to
+# build every subcommand's parser. Keep in sync with the subcommand help strings above
+TOP_LEVEL_HELP = """\
+usage: dpp [-h] [-v] {sort,s,calib,c,new,n,run,r,table,t} ...
+
+positional arguments:
+  {sort,s,calib,c,new,n,run,r,table,t}
+                        command to run
+    sort (s)            sort raw FastPDI data
+    calib (c)           create calibration files
+    new (n)             generate configuration files
+    run (r)             run the data processing pipeline
+    table (t)           create CSV from headers
+
+options:
+  -h, --help            show this help message and exit
+  -v, --version         print version information
+"""
+
+
+def add_subcommands(*names):
+    """
+    Add the parsers for the given subcommands (or all subcommands, if none are given) to the
+    top-level parser. Subcommands which have already been added are not rebuilt.
+
+    Parameters
+    ----------
+    names : str
+        Subcommand names or aliases
+
+    Returns
+    -------
+    dict
+        The subcommand parsers, keyed by name
+    """
+    if len(names) == 0:
+        names = SUBCOMMANDS.keys()
+    for name in names:
+        name = ALIASES.get(name, name)
+        if name not in _subparsers:
+            build_parser, aliases = SUBCOMMANDS[name]
+            _subparsers[name] = build_parser(subparser, aliases)
+    return _subparsers
+
+
+def print_version():
+    from fastpdi_dpp import __version__
+
+    print(__version__)
+
+
+@lru_cache
+def _get_nproc():
+    # only count the CPUs this process is allowed to run on, where supported
+    try:
+        ncpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        ncpus = os.cpu_count()
+    # limit default nproc since many operations are
+    # throttled by file I/O
+    return min(ncpus, 8)
+
+
+def _dispatch(args):
+    # resolve the working directory once for the subcommand instead of in each handler
+    args.cwd = Path.cwd()
+    if "num_proc" in args and args.num_proc is None:
+        args.num_proc = _get_nproc()
+    return args.func(args)
+
 
 def main():
-    args = parser.parse_args()
+    argv = sys.argv[1:]
+    # the version doesn't need any parsing
+    if argv in (["-v"], ["--version"]):
+        return print_version()
+    # no inputs, print help
+    if len(argv) == 0 or argv in (["-h"], ["--help"]):
+        sys.stdout.write(TOP_LEVEL_HELP)
+        return
+    command = ALIASES.get(argv[0], argv[0])
+    if command in SUBCOMMANDS:
+        # dispatch straight to the subcommand parser, which is the only one that gets built
+        command_parser = add_subcommands(command)[command]
+        args = command_parser.parse_args(argv[1:])
+        return _dispatch(args)
+    # otherwise build all subcommands for the top-level usage and argument errors
+    add_subcommands()
+    args = parser.parse_args(argv)
     if args.version:
-        return fpp.__version__
+        return print_version()
     if hasattr(args, "func"):
-        return args.func(args)
-    # no inputs, print help
+        return _dispatch(args)
     parser.print_help()
 
 
@@ -1,8 +1,6 @@
 from multiprocessing import cpu_count
 
-import astropy.units as u
 import numpy as np
-from astropy.coordinates import EarthLocation
 
 # important parameters
 PIXEL_SCALE = 15.3  # mas / px
@@ -10,7 +8,8 @@ PUPIL_OFFSET = 2.7  # deg
 PA_OFFSET = PUPIL_OFFSET - 180 - 39  # deg
 SATSPOT_ANGLE = (45 - PUPIL_OFFSET) % 90  # deg
 # Subaru location - DO NOT CHANGE!
-SUBARU_LOC = EarthLocation(lat=19.825504 * u.deg, lon=-155.4760187 * u.deg)
+SUBARU_LAT = 19.825504  # deg
+SUBARU_LON = -155.4760187  # deg
 
 FILTER_ANGULAR_SIZE = {
     "open": np.rad2deg(1.03e-6 / 7.79) * 3.6e6,
@@ -22,3 +21,15 @@ FILTER_ANGULAR_SIZE = {
 # limit default nproc since many operations are
 # throttled by file I/O
 DEFAULT_NPROC = min(cpu_count(), 8)
+
+
+def __getattr__(name):
+    # building `SUBARU_LOC` requires importing astropy, so wait until it's asked for
+    if name == "SUBARU_LOC":
+        import astropy.units as u
+        from astropy.coordinates import EarthLocation
+
+        global SUBARU_LOC
+        SUBARU_LOC = EarthLocation(lat=SUBARU_LAT * u.deg, lon=SUBARU_LON * u.deg)
+        return SUBARU_LOC
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,8 @@
 import multiprocessing as mp
 import shutil
 from collections import OrderedDict
+from collections.abc import Iterator
+from functools import partial
 from os import PathLike
 from pathlib import Path
 from typing import Optional
@@ -29,8 +31,8 @@ def dict_from_header_file(filename: PathLike, **kwargs) -> OrderedDict:
     summary = OrderedDict()
     # add path to row before the FITS header keys
     summary["path"] = path.resolve()
-    ext = 1 if ".fits.fz" in path.name else 0
-    header = fits.getheader(filename, ext=ext, **kwargs)
+    kwargs.setdefault("ext", 1 if ".fits.fz" in path.name else 0)
+    header = fits.getheader(filename, **kwargs)
     summary.update(dict_from_header(header))
     return summary
 
@@ -84,16 +86,43 @@ def header_table(
     -------
     pandas.DataFrame
     """
-    with mp.Pool(num_proc) as pool:
-        jobs = [pool.apply_async(dict_from_header_file, args=(f,)) for f in filenames]
-        iter = jobs if quiet else tqdm(jobs, desc="Parsing FITS headers")
-        rows = [job.get() for job in iter]
-
+    rows = list(header_table_iter(filenames, num_proc=num_proc, quiet=quiet))
     df = pd.DataFrame(rows)
     df.sort_values("MJD", inplace=True)
     return df
 
 
+def header_table_iter(
+    filenames: list[PathLike],
+    num_proc: int = min(8, mp.cpu_count()),
+    quiet: bool = False,
+    **kwargs,
+) -> Iterator[OrderedDict]:
+    """
+    Parse the FITS headers from the given files, yielding the summary for each file (in the same order as ``filenames``) as soon as it is ready, rather than collecting them into a table.
+
+    Parameters
+    ----------
+    filenames : list[pathlike]
+    num_proc : int, optional
+        Number of processes to use in multiprocessing, by default mp.cpu_count()
+    quiet : bool, optional
+        Silence the progress bar, by default False
+    **kwargs
+        All keyword arguments will be passed to ``dict_from_header_file``
+
+    Yields
+    ------
+    OrderedDict
+    """
+    func = partial(dict_from_header_file, **kwargs)
+    with mp.Pool(num_proc) as pool:
+        rows = pool.imap(func, filenames)
+        if not quiet:
+            rows = tqdm(rows, total=len(filenames), desc="Parsing FITS headers")
+        yield from rows
+
+
 # set up commands for parser to dispatch to
 def sort_files(
     filenames: list[PathLike],
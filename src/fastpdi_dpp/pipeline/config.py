@@ -1,19 +1,77 @@
-from dataclasses import dataclass
+import dataclasses
+import re
+from dataclasses import dataclass, fields, is_dataclass
+from functools import cached_property, lru_cache
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
-import astropy.units as u
-from astropy.coordinates import Angle, SkyCoord
-from serde import field, serialize
-from serde.toml import to_toml
+try:
+    import tomllib
+except ImportError:  # python < 3.11
+    import tomli as tomllib
+
+import tomli_w
 
 import fastpdi_dpp as vpp
 from fastpdi_dpp.constants import SATSPOT_ANGLE
 
+if TYPE_CHECKING:
+    from astropy.coordinates import Angle, SkyCoord
+
+# sexagesimal strings as formatted by `Angle.to_string(pad=True, sep=":")`. Only up to 7 decimals
+# are accepted, since longer fractions can be rounded (e.g. "-89:59:59.99999999" -> "-90:00:00")
+_SEXAGESIMAL_RE = re.compile(r"^-?\d{2}:[0-5]\d:[0-5]\d(\.\d{0,6}[1-9])?$")
+# the same for right ascension, which astropy only accepts for hours in [0, 24)
+_SEXAGESIMAL_HOUR_RE = re.compile(r"^(?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d(\.\d{0,6}[1-9])?$")
+
+
+def field(*, skip_if_default=False, **kwargs):
+    # `dataclasses.field`, with a flag to leave the value out of the TOML if it's the default
+    return dataclasses.field(metadata={"skip_if_default": skip_if_default}, **kwargs)
+
+
+@lru_cache
+def _field_specs(cls):
+    # (name, skip_if_default, default) for each field, looked up once per class
+    return tuple((f.name, f.metadata.get("skip_if_default", False), f.default) for f in fields(cls))
+
+
+def _to_plain(obj):
+    """
+    Convert a configuration dataclass into a dictionary of TOML-compatible values. Fields marked
+    `skip_if_default` are left out when they have their default value, `None` values are dropped,
+    and paths are converted to strings.
+    """
+    if is_dataclass(obj):
+        result = {}
+        for name, skip_if_default, default in _field_specs(type(obj)):
+            value = getattr(obj, name)
+            if value is None:
+                continue
+            if skip_if_default and value == default:
+                continue
+            result[name] = _to_plain(value)
+        return result
+    if isinstance(obj, dict):
+        return {k: _to_plain(v) for k, v in obj.items() if v is not None}
+    if isinstance(obj, (list, tuple)):
+        return [_to_plain(v) for v in obj]
+    if isinstance(obj, Path):
+        return str(obj)
+    return obj
+
+
+def to_toml(obj) -> str:
+    """
+    Serialize a configuration dataclass, or a dictionary of them, to a TOML string.
+    """
+    return tomli_w.dumps(_to_plain(obj))
+
 
 ## Some base classes for repeated functionality
-@serialize
-@dataclass(kw_only=True)
+# slotted subclasses call `OutputDirectory.__post_init__` directly, since zero-argument `super()`
+# doesn't work in dataclasses created with `slots=True`
+@dataclass(kw_only=True, slots=True)
 class OutputDirectory:
     output_directory: Optional[Path] = field(default=None, skip_if_default=True)
     force: bool = field(default=False, skip_if_default=True)
@@ -26,7 +84,6 @@ class OutputDirectory:
         return to_toml(self)
 
 
-@serialize
 @dataclass
 class CamFileInput:
     cam1: Optional[Path] = field(default=None, skip_if_default=True)
@@ -43,7 +100,6 @@ class CamFileInput:
         return to_toml(self)
 
 
-@serialize
 @dataclass
 class CoordinateOptions:
     """Astronomical coordinate options
@@ -83,19 +139,37 @@ class CoordinateOptions:
     obstime: str = field(default="J2016", skip_if_default=True)
 
     def __post_init__(self):
-        if isinstance(self.ra, str):
-            self.ra_ang = Angle(self.ra, "hour")
-        else:
+        if not isinstance(self.ra, str):
+            from astropy.coordinates import Angle
+
             self.ra_ang = Angle(self.ra, "deg")
-        self.ra = self.ra_ang.to_string(pad=True, sep=":")
-        self.dec_ang = Angle(self.dec, "deg")
-        self.dec = self.dec_ang.to_string(pad=True, sep=":")
+        # only reformat strings which aren't already normalized
+        if not isinstance(self.ra, str) or not _SEXAGESIMAL_HOUR_RE.match(self.ra):
+            self.ra = self.ra_ang.to_string(pad=True, sep=":")
+        if not isinstance(self.dec, str) or not _SEXAGESIMAL_RE.match(self.dec):
+            self.dec = self.dec_ang.to_string(pad=True, sep=":")
+
+    @cached_property
+    def ra_ang(self) -> "Angle":
+        from astropy.coordinates import Angle
+
+        return Angle(self.ra, "hour")
+
+    @cached_property
+    def dec_ang(self) -> "Angle":
+        from astropy.coordinates import Angle
+
+        return Angle(self.dec, "deg")
 
     def to_toml(self) -> str:
         obj = {"coordinate": self}
         return to_toml(obj)
 
-    def get_coord(self) -> SkyCoord:
+    @cached_property
+    def _coord(self) -> "SkyCoord":
+        import astropy.units as u
+        from astropy.coordinates import SkyCoord
+
         return SkyCoord(
             ra=self.ra_ang,
             dec=self.dec_ang,
@@ -106,10 +180,13 @@ class CoordinateOptions:
             obstime=self.obstime,
         )
 
+    def get_coord(self) -> "SkyCoord":
+        # like `ra_ang` and `dec_ang`, the coordinate is only built once
+        return self._coord
+
 
 ## Define classes for each configuration block
-@serialize
-@dataclass
+@dataclass(slots=True)
 class DistortionOptions:
     """Geometric distortion correction options
 
@@ -134,7 +211,6 @@ class DistortionOptions:
         return to_toml(obj)
 
 
-@serialize
 @dataclass
 class CalibrateOptions(OutputDirectory):
     """Options for general image calibration
@@ -201,7 +277,6 @@ class CalibrateOptions(OutputDirectory):
         return to_toml(obj)
 
 
-@serialize
 @dataclass(frozen=True)
 class CoronagraphOptions:
     """Coronagraph options
@@ -224,12 +299,15 @@ class CoronagraphOptions:
 
     iwa: float
 
+    @cached_property
+    def _toml(self) -> str:
+        # frozen, so the serialized output can't change
+        return to_toml({"coronagraph": self})
+
     def to_toml(self) -> str:
-        obj = {"coronagraph": self}
-        return to_toml(obj)
+        return self._toml
 
 
-@serialize
 @dataclass(frozen=True)
 class SatspotOptions:
     """Satellite spot options
@@ -260,13 +338,16 @@ class SatspotOptions:
     angle: float = field(default=SATSPOT_ANGLE)
     amp: float = field(default=50)
 
+    @cached_property
+    def _toml(self) -> str:
+        # frozen, so the serialized output can't change
+        return to_toml({"satspots": self})
+
     def to_toml(self) -> str:
-        obj = {"satspots": self}
-        return to_toml(obj)
+        return self._toml
 
 
-@serialize
-@dataclass
+@dataclass(slots=True)
 class FrameSelectOptions(OutputDirectory):
     """Frame selection options
 
@@ -311,7 +392,7 @@ class FrameSelectOptions(OutputDirectory):
     window_size: int = field(default=20, skip_if_default=True)
 
     def __post_init__(self):
-        super().__post_init__()
+        OutputDirectory.__post_init__(self)
         if self.metric not in ("peak", "l2norm", "normvar"):
             raise ValueError(f"Frame selection metric not recognized: {self.metric}")
         if self.cutoff < 0 or self.cutoff > 1:
@@ -324,8 +405,7 @@ class FrameSelectOptions(OutputDirectory):
         return to_toml(obj)
 
 
-@serialize
-@dataclass
+@dataclass(slots=True)
 class RegisterOptions(OutputDirectory):
     """Image registration options
 
@@ -375,7 +455,7 @@ class RegisterOptions(OutputDirectory):
     dft_factor: int = field(default=1, skip_if_default=True)
 
     def __post_init__(self):
-        super().__post_init__()
+        OutputDirectory.__post_init__(self)
         if self.method not in ("com", "peak", "dft", "airydisk", "moffat", "gaussian"):
             raise ValueError(f"Registration method not recognized: {self.method}")
 
@@ -384,8 +464,7 @@ class RegisterOptions(OutputDirectory):
         return to_toml(obj)
 
 
-@serialize
-@dataclass
+@dataclass(slots=True)
 class CollapseOptions(OutputDirectory):
     """
     Cube collapse options
@@ -424,7 +503,7 @@ class CollapseOptions(OutputDirectory):
     method: str = field(default="median", skip_if_default=True)
 
     def __post_init__(self):
-        super().__post_init__()
+        OutputDirectory.__post_init__(self)
         if self.method not in ("median", "mean", "varmean", "biweight"):
             raise ValueError(f"Collapse method not recognized: {self.method}")
 
@@ -433,8 +512,7 @@ class CollapseOptions(OutputDirectory):
         return to_toml(obj)
 
 
-@serialize
-@dataclass
+@dataclass(slots=True)
 class IPOptions:
     """Instrumental polarization (IP) correction options.
 
@@ -475,8 +553,7 @@ class IPOptions:
         return to_toml(obj)
 
 
-@serialize
-@dataclass
+@dataclass(slots=True)
 class PolarimetryOptions(OutputDirectory):
     """Polarimetric differential imaging (PDI) options
 
@@ -527,7 +604,7 @@ class PolarimetryOptions(OutputDirectory):
     derotate_pa: bool = field(default=False, skip_if_default=True)
 
     def __post_init__(self):
-        super().__post_init__()
+        OutputDirectory.__post_init__(self)
         if self.ip is not None and isinstance(self.ip, dict):
             self.ip = IPOptions(**self.ip)
 
@@ -536,25 +613,20 @@ class PolarimetryOptions(OutputDirectory):
         return to_toml(obj)
 
 
-@serialize
-@dataclass
+@dataclass(frozen=True, slots=True)
 class CamCtrOption:
-    cam1: Optional[list[float]] = field(default=None, skip_if_default=True)
-    cam2: Optional[list[float]] = field(default=None, skip_if_default=True)
+    cam1: Optional[tuple[float, float]] = field(default=None, skip_if_default=True)
+    cam2: Optional[tuple[float, float]] = field(default=None, skip_if_default=True)
 
     def __post_init__(self):
-        if self.cam1 is not None:
-            self.cam1 = list(self.cam1)
-            if len(self.cam1) == 0:
-                self.cam1 = None
-        if self.cam2 is not None:
-            self.cam2 = list(self.cam2)
-            if len(self.cam2) == 0:
-                self.cam2 = None
+        # frozen, so fields have to be normalized with `object.__setattr__`
+        for name in ("cam1", "cam2"):
+            value = getattr(self, name)
+            if value is not None:
+                object.__setattr__(self, name, tuple(value) if len(value) > 0 else None)
 
 
-@serialize
-@dataclass
+@dataclass(slots=True)
 class ProductOptions(OutputDirectory):
     """The output products from the processing pipeline.
 
@@ -614,7 +686,21 @@ class ProductOptions(OutputDirectory):
 
 
 ## Define classes for entire pipelines now
-@serialize
+
+# pipeline sections which are converted from dictionaries (e.g., when loaded from TOML)
+_NESTED_OPTIONS = (
+    ("coordinate", CoordinateOptions),
+    ("coronagraph", CoronagraphOptions),
+    ("satspots", SatspotOptions),
+    ("calibrate", CalibrateOptions),
+    ("frame_select", FrameSelectOptions),
+    ("register", RegisterOptions),
+    ("collapse", CollapseOptions),
+    ("polarimetry", PolarimetryOptions),
+    ("products", ProductOptions),
+)
+
+
 @dataclass
 class PipelineOptions:
     """Data Processing Pipeline options
@@ -711,24 +797,22 @@ class PipelineOptions:
     version: str = vpp.__version__
 
     def __post_init__(self):
-        if self.coordinate is not None and isinstance(self.coordinate, dict):
-            self.coordinate = CoordinateOptions(**self.coordinate)
-        if self.coronagraph is not None and isinstance(self.coronagraph, dict):
-            self.coronagraph = CoronagraphOptions(**self.coronagraph)
-        if self.satspots is not None and isinstance(self.satspots, dict):
-            self.satspots = SatspotOptions(**self.satspots)
-        if self.calibrate is not None and isinstance(self.calibrate, dict):
-            self.calibrate = CalibrateOptions(**self.calibrate)
-        if self.frame_select is not None and isinstance(self.frame_select, dict):
-            self.frame_select = FrameSelectOptions(**self.frame_select)
-        if self.register is not None and isinstance(self.register, dict):
-            self.register = RegisterOptions(**self.register)
-        if self.collapse is not None and isinstance(self.collapse, dict):
-            self.collapse = CollapseOptions(**self.collapse)
-        if self.polarimetry is not None and isinstance(self.polarimetry, dict):
-            self.polarimetry = PolarimetryOptions(**self.polarimetry)
-        if self.products is not None and isinstance(self.products, dict):
-            self.products = ProductOptions(**self.products)
+        for name, options_class in _NESTED_OPTIONS:
+            value = getattr(self, name)
+            if isinstance(value, dict):
+                setattr(self, name, options_class(**value))
+
+    @classmethod
+    def from_toml(cls, toml_str: str):
+        """
+        Load options from a TOML string, e.g. the output of `to_toml`.
+
+        Parameters
+        ----------
+        toml_str : str
+            String of TOML configuration settings.
+        """
+        return cls(**tomllib.loads(toml_str))
 
     def to_toml(self) -> str:
         return to_toml(self)
@@ -5,10 +5,13 @@ from os import PathLike
 from pathlib import Path
 from typing import Optional, Tuple
 
+try:
+    import tomllib
+except ImportError:  # python < 3.11
+    import tomli as tomllib
+
 import numpy as np
-import tomli
 from astropy.io import fits
-from serde.toml import to_toml
 from tqdm.auto import tqdm
 
 import fastpdi_dpp as vpp
@@ -74,7 +77,7 @@ class Pipeline(PipelineOptions):
         >>> Pipeline.from_file("config.toml")
         """
         with open(filename, "rb") as fh:
-            config = tomli.load(fh)
+            config = tomllib.load(fh)
         return cls(**config)
 
     @classmethod
@@ -92,8 +95,7 @@ class Pipeline(PipelineOptions):
         ValueError
             If the configuration `version` is not compatible with the current `fastpdi_dpp` version.
         """
-        config = tomli.loads(toml_str)
-        return cls(**config)
+        return cls.from_toml(toml_str)
 
     def to_file(self, filename: PathLike):
         """
@@ -104,9 +106,8 @@ class Pipeline(PipelineOptions):
         filename : PathLike
             Output filename
         """
-        # use serde.to_toml to serialize self
         path = Path(filename)
-        path.write_text(to_toml(self))
+        path.write_text(self.to_toml())
 
     def run(self, filenames, num_proc=None):
         """Run the pipeline
@@ -391,9 +392,7 @@ class Pipeline(PipelineOptions):
         # 3. Do higher-order correction
         if self.products is not None:
             self.polarimetry_doublediff(
-                force=tripwire,
-                N_per_hwp=config.N_per_hwp,
-                derotate_pa=config.derotate_pa
+                force=tripwire, N_per_hwp=config.N_per_hwp, derotate_pa=config.derotate_pa
             )
 
         self.logger.info("Finished PDI")
@@ -1,13 +1,22 @@
+import math
+import os
 import re
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from enum import Enum
+from functools import lru_cache
 from pathlib import Path
 
 import numpy as np
-from astropy.io import fits
 from numpy.typing import ArrayLike
-from packaging import version
-from scipy.stats import circmean
+
+# matches the FITS extension and any compression extension after it, e.g. ".fits.fz"
+_FITS_SUFFIX_RE = re.compile(r"\.fits(?:\..*)?")
+# major, minor, and patch numbers of a version string, ignoring any pre-release or local parts
+_SEMVER_RE = re.compile(r"^v?(\d+)\.(\d+)\.(\d+)")
+
+_DEG2RAD = math.pi / 180
+_RAD2DEG = 180 / math.pi
 
 
 def wrap_angle(angle: float) -> float:
@@ -31,37 +40,98 @@ def wrap_angle(angle: float) -> float:
     return angle
 
 
-def average_angle(angles: ArrayLike):
+def average_angle(angles: ArrayLike, *, precision: str = "double", radians: bool = False):
     """
-    Return the circular mean of the given angles in degrees.
+    Return the circular mean of the given angles.
 
     Parameters
     ----------
     angles : ArrayLike
-        Angles in degrees, between [180, -180]
+        Angles in degrees, between [180, -180] (or in radians, if `radians` is true)
+    precision : str
+        Either `"double"` (the default), which uses double-precision trigonometry and exact
+        sums, or `"single"`, which uses single-precision trigonometry and double-precision
+        sums. Single precision is much faster for very large inputs, but less accurate when the
+        angles are spread around the whole circle and the sums nearly cancel.
+    radians : bool
+        If true, the angles are given, and the average is returned, in radians instead of
+        degrees. By default false.
 
     Returns
     -------
     average_angle
-        The average angle in degrees via the circular mean
+        The average angle via the circular mean
+    """
+    if precision not in ("double", "single"):
+        raise ValueError(f"Precision not recognized: {precision}")
+    dtype = np.float64 if precision == "double" else np.float32
+    rads = np.ravel(np.asarray(angles, dtype=dtype))
+    # the empty sums would give `atan2(0, 0) == 0`, but there is no mean of no angles
+    if rads.size == 0:
+        return np.nan
+    if not radians:
+        rads = rads * _DEG2RAD
+    # reuse one buffer for both the sines and cosines. arctan2 is scale-invariant, so the sums
+    # don't need to be divided into means
+    buf = np.empty_like(rads)
+    if precision == "double":
+        # `fsum` is exact, which matters when the sums nearly cancel, and is faster than
+        # `ndarray.sum` for the handful of angles typically averaged
+        sin_sum = math.fsum(np.sin(rads, out=buf))
+        cos_sum = math.fsum(np.cos(rads, out=buf))
+    else:
+        sin_sum = np.add.reduce(np.sin(rads, out=buf), dtype=np.float64)
+        cos_sum = np.add.reduce(np.cos(rads, out=buf), dtype=np.float64)
+    radmean = math.atan2(sin_sum, cos_sum)
+    return radmean if radians else radmean * _RAD2DEG
+
+
+def scan_headers(filelist, fn, ext: int | str = 0, workers: int = 8):
     """
-    rads = np.deg2rad(angles)
-    radmean = circmean(rads, high=np.pi, low=-np.pi)
-    return np.rad2deg(radmean)
+    Read the FITS header of every file and apply a function to each.
+
+    Only the headers are read, not the data. Reading headers is mostly waiting on file I/O, so
+    the files are read concurrently with a thread pool.
+
+    Parameters
+    ----------
+    filelist : Iterable[PathLike]
+        FITS files to read
+    fn : Callable
+        Function which takes a header and returns a result
+    ext : int | str
+        FITS extension/HDU to read the header from, by default 0
+    workers : int
+        Number of threads to use, by default 8
+
+    Returns
+    -------
+    list
+        The result of `fn` for each file, in the same order as `filelist`
+    """
+    from astropy.io import fits
+
+    def scan(filename):
+        return fn(fits.getheader(filename, ext))
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(scan, filelist))
 
 
 def find_dark_settings(filelist):
-    exp_set = set()
-    for filename in filelist:
-        with fits.open(filename) as hdus:
-            hdr = hdus[0].header
-            texp = hdr["EXPTIME"]  # exposure time in seconds
-            gain = hdr["U_EMGAIN"]
-            exp_set.add((texp, gain))
+    # exposure time in seconds and EM gain of each file
+    return set(scan_headers(filelist, lambda hdr: (hdr["EXPTIME"], hdr["U_EMGAIN"])))
+
 
-    return exp_set
+@lru_cache(maxsize=512)
+def _parse_version(version: str) -> tuple[int, int, int]:
+    match = _SEMVER_RE.match(version)
+    if match is None:
+        raise ValueError(f"Invalid version string: {version!r}")
+    return tuple(map(int, match.groups()))
 
 
+@lru_cache(maxsize=256)
 def check_version(config: str, vpp: str) -> bool:
     """
     Checks compatibility between versions following semantic versioning.
@@ -77,37 +147,94 @@ def check_version(config: str, vpp: str) -> bool:
     -------
     bool
     """
-    config_maj, config_min, config_pat = version.parse(config).release
-    vpp_maj, vpp_min, vpp_pat = version.parse(vpp).release
-    if vpp_maj == 0:
-        flag = config_maj == vpp_maj and config_min == vpp_min and vpp_pat >= config_pat
-    else:
-        flag = config_maj == vpp_maj and vpp_min >= config_min
-        if vpp_min == config_min:
-            flag = flag and vpp_pat >= config_pat
-    return flag
+    config_ver = _parse_version(config)
+    vpp_ver = _parse_version(vpp)
+    # before 1.0.0 minor versions are breaking, otherwise only major versions are
+    nfixed = 2 if vpp_ver[0] == 0 else 1
+    return config_ver[:nfixed] == vpp_ver[:nfixed] and vpp_ver >= config_ver
+
+
+def _replace_fits_suffix(name, ending):
+    # plain string operations for the usual case of a single ".fits" with an optional
+    # compression extension, which gives the same result as `_FITS_SUFFIX_RE.sub`
+    stem, sep, rest = name.partition(".fits")
+    if not sep:
+        return name
+    if not rest or rest[0] == ".":
+        return stem + ending
+    return _FITS_SUFFIX_RE.sub(ending, name)
 
 
 def get_paths(
     filename, /, suffix=None, outname=None, output_directory=None, filetype=".fits", **kwargs
 ):
-    path = Path(filename)
-    _suffix = "" if suffix is None else f"_{suffix}"
+    # a single `stat` when the directory already exists. This is checked on every call rather
+    # than remembered, so a directory which was deleted in the meantime gets recreated
+    if output_directory and not os.path.isdir(output_directory):
+        os.makedirs(output_directory, exist_ok=True)
+    # any other keyword arguments are ignored, so they are left out of the cache key
+    return _get_paths(filename, suffix, outname, output_directory, filetype)
+
+
+@lru_cache(maxsize=4096)
+def _get_paths(filename, suffix, outname, output_directory, filetype):
+    path = filename if isinstance(filename, Path) else Path(filename)
+    if outname is None:
+        ending = filetype if suffix is None else f"_{suffix}{filetype}"
+        outname = _replace_fits_suffix(path.name, ending)
+        if output_directory is None:
+            # only the filename changes, so skip building the parent directory path
+            return path, path.with_name(outname)
     if output_directory is None:
-        output_directory = path.parent
+        return path, path.parent / outname
+    if isinstance(output_directory, Path):
+        outpath = output_directory / outname
     else:
-        output_directory = Path(output_directory)
-        output_directory.mkdir(parents=True, exist_ok=True)
-    if outname is None:
-        outname = re.sub("\.fits(\..*)?", f"{_suffix}{filetype}", path.name)
-    outpath = output_directory / outname
+        # join as strings, so only one `Path` gets built
+        outpath = Path(os.path.join(output_directory, outname))
     return path, outpath
 
 
+def get_paths_batch(
+    filenames, /, suffix=None, outname=None, output_directory=None, filetype=".fits", **kwargs
+):
+    """
+    Get the input and output paths for many files which share the same options. This is
+    equivalent to calling `get_paths` for each file, but the output directory is only parsed
+    once.
+
+    Parameters
+    ----------
+    filenames : Iterable[PathLike]
+        Input filenames
+    suffix, outname, output_directory, filetype
+        Options shared by every file, see `get_paths`
+
+    Returns
+    -------
+    list[tuple[Path, Path]]
+        The `(path, outpath)` pair for each input file, in order
+    """
+    if output_directory is not None and not isinstance(output_directory, Path):
+        output_directory = Path(output_directory)
+    return [
+        get_paths(
+            filename,
+            suffix=suffix,
+            outname=outname,
+            output_directory=output_directory,
+            filetype=filetype,
+        )
+        for filename in filenames
+    ]
+
+
 def any_file_newer(filenames, outpath):
-    out_mt = Path(outpath).stat().st_mtime
-    gen = (Path(f).stat().st_mtime > out_mt for f in filenames)
-    return any(gen)
+    out_mt = os.stat(outpath).st_mtime
+    for filename in filenames:
+        if os.stat(filename).st_mtime > out_mt:
+            return True
+    return False
 
 
 class FileType(Enum):
@@ -115,13 +242,16 @@ class FileType(Enum):
     OG = 1
 
 
-@dataclass(frozen=True)
+_VALID_CAMERAS = frozenset((1, 2))
+
+
+@dataclass(frozen=True, slots=True)
 class FileInfo:
     file_type: FileType
     camera: int
 
     def __post_init__(self):
-        if not (self.camera == 1 or self.camera == 2):
+        if self.camera not in _VALID_CAMERAS:
             raise ValueError(f"Invalid camera number {self.camera}")
 
     @classmethod
@@ -135,6 +265,27 @@ class FileInfo:
 
     @classmethod
     def from_file(cls, filename, ext: int | str = 0):
+        from astropy.io import fits
+
         with fits.open(filename) as hdus:
             hdu = hdus[ext]
             return cls.from_hdr(hdu.header)
+
+    @classmethod
+    def from_files(cls, filelist, ext: int | str = 0):
+        """
+        Get the `FileInfo` of many files, reading their headers concurrently with `scan_headers`.
+
+        Parameters
+        ----------
+        filelist : Iterable[PathLike]
+            FITS files to read
+        ext : int | str
+            FITS extension/HDU to read the header from, by default 0
+
+        Returns
+        -------
+        list[FileInfo]
+            The info for each file, in the same order as `filelist`
+        """
+        return scan_headers(filelist, cls.from_hdr, ext=ext)
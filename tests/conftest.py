@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+from astropy.io import fits
+
+# headers with different keys, out of MJD order
+HEADERS = [
+    {"MJD": 59634.5, "EXPTIME": 0.1},
+    {"MJD": 59634.2, "OBJECT": "ABAUR"},
+    {"MJD": 59634.3, "EXPTIME": 0.5, "U_CAMERA": 1},
+]
+
+
+@pytest.fixture
+def header_files(tmp_path):
+    """FITS files with the keys of each of `HEADERS` only in the image extension (ext 1)"""
+    filenames = []
+    for i, header in enumerate(HEADERS):
+        filename = tmp_path / f"data_{i}.fits"
+        hdul = fits.HDUList(
+            [fits.PrimaryHDU(), fits.ImageHDU(np.zeros((4, 4)), fits.Header(header))]
+        )
+        hdul.writeto(filename)
+        filenames.append(filename)
+    return filenames, HEADERS
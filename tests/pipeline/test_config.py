@@ -2,7 +2,6 @@ from pathlib import Path
 
 import pytest
 import tomli
-from serde.toml import to_toml
 
 from fastpdi_dpp.pipeline.config import *
 
@@ -231,6 +230,39 @@ class TestIPOptions:
         assert conf == toml_conf
 
 
+class TestCoordinateOptions:
+    @pytest.mark.parametrize(
+        ("dec", "expected"),
+        [
+            ("-10:00:00", "-10:00:00"),
+            ("-10:00:00.1234567", "-10:00:00.1234567"),
+            ("-10:00:00.10", "-10:00:00.1"),
+            ("-89:59:59.99999999", "-90:00:00"),
+            (-10.5, "-10:30:00"),
+        ],
+    )
+    def test_normalize_dec(self, dec, expected):
+        conf = CoordinateOptions(object="AB Aur", ra="04:55:45.8", dec=dec, parallax=6.4)
+        assert conf.dec == expected
+
+    @pytest.mark.parametrize(
+        ("ra", "expected"),
+        [
+            ("04:55:45.8", "04:55:45.8"),
+            ("23:59:59.1234567", "23:59:59.1234567"),
+            ("04:55:45.80", "04:55:45.8"),
+        ],
+    )
+    def test_normalize_ra(self, ra, expected):
+        conf = CoordinateOptions(object="AB Aur", ra=ra, dec="30:33:04.3", parallax=6.4)
+        assert conf.ra == expected
+
+    @pytest.mark.parametrize("ra", ["25:00:00", "72:00:00"])
+    def test_invalid_ra(self, ra):
+        with pytest.raises(ValueError):
+            CoordinateOptions(object="AB Aur", ra=ra, dec="30:33:04.3", parallax=6.4)
+
+
 class TestPipelineOptions:
     def test_error_creation(self):
         with pytest.raises(TypeError):
@@ -281,3 +313,12 @@ class TestPipelineOptions:
         assert conf.polarimetry == PolarimetryOptions(output_directory="pdi")
         toml_conf = PipelineOptions(**tomli.loads(to_toml(conf)))
         assert conf == toml_conf
+
+    def test_from_toml(self):
+        conf = PipelineOptions(
+            name="test",
+            coronagraph=dict(iwa=55),
+            calibrate=dict(output_directory="calibrated"),
+            polarimetry=dict(output_directory="pdi"),
+        )
+        assert PipelineOptions.from_toml(conf.to_toml()) == conf
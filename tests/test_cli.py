@@ -0,0 +1,29 @@
+import csv
+from argparse import Namespace
+
+from fastpdi_dpp.cli.fpp import TOP_LEVEL_HELP, add_subcommands, parser, table
+
+
+def test_table(header_files, tmp_path):
+    filenames, headers = header_files
+    outpath = tmp_path / "header_table.csv"
+    args = Namespace(filenames=filenames, output=outpath, ext=1, num_proc=1, quiet=True)
+    table(args)
+
+    with outpath.open(newline="") as fh:
+        reader = csv.DictReader(fh)
+        rows = list(reader)
+    # no index column, and every header key is a column
+    assert reader.fieldnames[0] == "path"
+    assert {key for header in headers for key in header} <= set(reader.fieldnames)
+    # sorted by MJD
+    assert [float(row["MJD"]) for row in rows] == sorted(header["MJD"] for header in headers)
+    # keys missing from a header are left empty
+    assert rows[0]["EXPTIME"] == ""
+
+
+def test_top_level_help(monkeypatch):
+    # the help is wrapped to the terminal width
+    monkeypatch.setenv("COLUMNS", "80")
+    add_subcommands()
+    assert parser.format_help() == TOP_LEVEL_HELP
@@ -1,6 +1,6 @@
 from pathlib import Path
 
-from fastpdi_dpp.organization import dict_from_header, header_table
+from fastpdi_dpp.organization import dict_from_header, header_table, header_table_iter
 
 TEST_DIR = Path(__file__).parent
 TEST_FILE = Path(TEST_DIR, "data", "VMPA00021059.fits")
@@ -253,3 +253,13 @@ def test_header_table():
         summary["COMMENT"]
         == "FITS (Flexible Image Transport System) format is defined in 'Astronomy, and Astrophysics', volume 376, page 359; bibcode: 2001A&A...376..359H"
     )
+
+
+def test_header_table_iter(header_files):
+    filenames, headers = header_files
+    rows = list(header_table_iter(filenames, num_proc=1, quiet=True, ext=1))
+    # rows are in the same order as the inputs
+    assert [row["path"] for row in rows] == [f.resolve() for f in filenames]
+    for row, header in zip(rows, headers):
+        for key, value in header.items():
+            assert row[key] == value
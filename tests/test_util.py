@@ -1,20 +1,41 @@
+import shutil
 from pathlib import Path
 
 import numpy as np
 import pytest
+from astropy.io import fits
 
-from fastpdi_dpp.util import average_angle, check_version, get_paths
+from fastpdi_dpp.util import (
+    FileInfo,
+    FileType,
+    average_angle,
+    check_version,
+    find_dark_settings,
+    get_paths,
+    get_paths_batch,
+)
 
 
-def test_average_angle():
+@pytest.mark.parametrize("size", [100, 10_000, 1_000_000])
+def test_average_angle(size):
     # generate random angles
-    xs = np.random.rand(100) * 2 - 1
-    ys = np.random.rand(100) * 2 - 1
+    rng = np.random.default_rng(0)
+    xs = rng.uniform(-1, 1, size)
+    ys = rng.uniform(-1, 1, size)
     angles = np.arctan2(ys, xs)
     angles_deg = np.rad2deg(angles)
     expected = np.arctan2(np.sin(angles).mean(), np.cos(angles).mean())
     expected_deg = np.rad2deg(expected)
     assert np.allclose(expected_deg, average_angle(angles_deg))
+    assert np.allclose(expected, average_angle(angles, radians=True))
+    assert np.isclose(
+        expected_deg, average_angle(angles_deg, precision="single"), rtol=0, atol=1e-2
+    )
+
+
+@pytest.mark.parametrize("radians", [False, True])
+def test_average_angle_empty(radians):
+    assert np.isnan(average_angle([], radians=radians))
 
 
 @pytest.mark.parametrize(
@@ -69,7 +90,66 @@ def test_check_version(cver, vpver, exp):
     ],
 )
 def test_get_paths(name, kwds, expected):
-    name = "test.fits"
     path, outpath = get_paths(name, **kwds)
     assert path == Path(name)
     assert outpath == Path(expected)
+
+
+@pytest.mark.parametrize("output_directory", [None, "test"])
+def test_get_paths_batch(tmp_path, output_directory):
+    names = [tmp_path / "test1.fits", tmp_path / "test2.fits.fz", str(tmp_path / "test3.fits")]
+    if output_directory is not None:
+        output_directory = tmp_path / output_directory
+    kwds = dict(output_directory=output_directory, suffix="calib")
+    expected = [get_paths(name, **kwds) for name in names]
+    assert get_paths_batch(names, **kwds) == expected
+
+
+def test_get_paths_recreates_output_directory(tmp_path):
+    outdir = tmp_path / "out"
+    get_paths("test.fits", output_directory=outdir)
+    assert outdir.is_dir()
+    # e.g. deleting the outputs and re-running in the same session
+    shutil.rmtree(outdir)
+    get_paths("test.fits", output_directory=outdir)
+    assert outdir.is_dir()
+
+
+def test_find_dark_settings(tmp_path):
+    settings = [(0.1, 300), (0.5, 300), (0.1, 300), (0.1, 0)]
+    filenames = []
+    for i, (exptime, emgain) in enumerate(settings):
+        filename = tmp_path / f"dark_{i}.fits"
+        fits.writeto(
+            filename, np.zeros((4, 4)), fits.Header({"EXPTIME": exptime, "U_EMGAIN": emgain})
+        )
+        filenames.append(filename)
+    assert find_dark_settings(filenames) == {(0.1, 300), (0.5, 300), (0.1, 0)}
+
+
+@pytest.mark.parametrize("ext", [0, 1])
+def test_file_info_from_files(tmp_path, ext):
+    cameras = [2, 1, 1, 2, 1]
+    filenames = []
+    for i, camera in enumerate(cameras):
+        header = fits.Header({"U_CAMERA": camera})
+        # only some of the files are gen2 files
+        if i % 2 == 0:
+            header["U_FLCSTT"] = 1
+        hdu = fits.ImageHDU(np.zeros((4, 4)), header)
+        hdul = fits.HDUList([fits.PrimaryHDU(header=header if ext == 0 else None), hdu])
+        filename = tmp_path / f"data_{i}.fits"
+        hdul.writeto(filename)
+        filenames.append(filename)
+    expected = [
+        FileInfo(FileType.GEN2 if i % 2 == 0 else FileType.OG, camera)
+        for i, camera in enumerate(cameras)
+    ]
+    assert FileInfo.from_files(filenames, ext=ext) == expected
+    assert [FileInfo.from_file(filename, ext=ext) for filename in filenames] == expected
+
+
+def test_get_paths_empty_output_directory():
+    # an empty output directory is the current directory, which already exists
+    path, outpath = get_paths("test.fits", output_directory="")
+    assert outpath == Path("test.fits")